@@ -1,10 +1,18 @@
 import streamlit as st
 import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
-from scipy.integrate import solve_ivp
-from typing import List, Dict
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
 
 k_e = 8.99e9
+# Suavização de Plummer (ε = 0.05 m): r² -> r² + ε², sem singularidade nas cargas.
+# Só no grid, nos cones, nas linhas e em U; o ponto de teste usa a lei de Coulomb exata.
+eps2 = 0.05**2
 epsilon_0 = 1 / (4 * np.pi * k_e)
 
 st.set_page_config(page_title="Campo Elétrico", layout="centered")
@@ -27,7 +35,9 @@ Mova as cargas e veja o padrão evoluir — pergunte a si mesmo: o que acontece
 with st.sidebar:
     st.header("Defina as Cargas")
     num_charges = st.slider("Número de cargas", 1, 5, 2, help="Adicione cargas para ver a superposição em ação")
-    charges: List[Dict] = []
+    # Cargas em formato SoA: posições (M, 3) e valores (M,)
+    pos_arr = np.empty((num_charges, 3))
+    q_arr = np.empty(num_charges)
     for i in range(num_charges):
         with st.expander(f"Carga {i+1}", expanded=i < 2):
             q_mag = st.number_input(f"Magnitude (μC)", min_value=0.1, max_value=10.0, value=1.0, step=0.1, key=f"q_mag_{i}")
@@ -36,7 +46,8 @@ with st.sidebar:
             x = st.number_input(f"x (m)", min_value=-2.0, max_value=2.0, value=-0.5 if i%2==0 else 0.5, step=0.1, key=f"x_{i}")
             y = st.number_input(f"y (m)", min_value=-2.0, max_value=2.0, value=0.0, step=0.1, key=f"y_{i}")
             z = st.number_input(f"z (m)", min_value=-2.0, max_value=2.0, value=0.0, step=0.1, key=f"z_{i}")
-            charges.append({"pos": np.array([x, y, z]), "q": q})
+            pos_arr[i] = (x, y, z)
+            q_arr[i] = q
 
     st.header("Visualização")
     num_lines = st.slider("Densidade de linhas de campo", 10, 50, 25, help="Mais linhas revelam melhor a intensidade |E|")
@@ -52,81 +63,166 @@ with st.sidebar:
         test_z = st.slider("z_teste (m)", -2.0, 2.0, 0.0, 0.1)
         test_pos = np.array([test_x, test_y, test_z])
 
-# Cálculos rigorosos
-def e_individual(pos: np.ndarray, charge: Dict) -> np.ndarray:
-    r_vec = pos - charge["pos"]
-    r = np.linalg.norm(r_vec)
-    if r < 1e-8:
-        return np.zeros(3)
-    return k_e * charge["q"] * r_vec / r**3
-
-def e_total(pos: np.ndarray, charges: List[Dict]) -> np.ndarray:
-    return sum(e_individual(pos, c) for c in charges)
-
-def potential(pos: np.ndarray, charges: List[Dict]) -> float:
-    V = 0.0
-    for c in charges:
-        r = np.linalg.norm(pos - c["pos"])
-        if r < 1e-8:
-            continue
-        V += k_e * c["q"] / r
-    return V
-
-# Energia U (aproximação numérica)
-grid_size_energy = 20
-x_range = np.linspace(-2, 2, grid_size_energy)
-X, Y, Z = np.meshgrid(x_range, x_range, x_range)
-points_energy = np.column_stack((X.ravel(), Y.ravel(), Z.ravel()))
-E_values = np.array([e_total(p) for p in points_energy])
-dV = ((4) / (grid_size_energy - 1))**3
-U = (epsilon_0 / 2) * np.sum(np.linalg.norm(E_values, axis=1)**2) * dV
-
-# Malha para visualização
-grid_size = 15
-x = np.linspace(-1.5, 1.5, grid_size)
-X_v, Y_v, Z_v = np.meshgrid(x, x, x)
-points_v = np.column_stack((X_v.ravel(), Y_v.ravel(), Z_v.ravel()))
+# Cálculos rigorosos (broadcasting sobre pontos × cargas)
+def _e_field_numpy(points: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray, return_per_charge: bool = False):
+    r = points[:, None, :] - pos_arr[None, :, :]  # (N, M, 3)
+    r2 = (r * r).sum(-1) + eps2  # (N, M)
+    inv_r3 = r2**-1.5
+    contrib = k_e * q_arr[None, :, None] * inv_r3[:, :, None] * r  # (N, M, 3): contribuição de cada carga
+    if return_per_charge:
+        return contrib, contrib.sum(axis=1)
+    return contrib.sum(axis=1)
+
+@st.cache_resource
+def _numba_kernel():
+    # Kernel definido uma vez por processo: um @njit ao nível do script seria
+    # redefinido (e recarregado da cache em disco) em cada rerun.
+    # O ciclo sobre as cargas fica inline: um kernel aninhado não entra na cache em disco.
+    if not HAS_NUMBA:
+        return None
+
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _e_field_numba(points: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray) -> np.ndarray:
+        E = np.zeros_like(points)
+        for n in prange(points.shape[0]):
+            for i in range(pos_arr.shape[0]):
+                dx = points[n, 0] - pos_arr[i, 0]
+                dy = points[n, 1] - pos_arr[i, 1]
+                dz = points[n, 2] - pos_arr[i, 2]
+                r2 = dx*dx + dy*dy + dz*dz + eps2
+                f = k_e * q_arr[i] * r2**-1.5
+                E[n, 0] += f * dx
+                E[n, 1] += f * dy
+                E[n, 2] += f * dz
+        return E
+
+    return _e_field_numba
+
+def e_field(points: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray, return_per_charge: bool = False):
+    # As contribuições individuais só existem antes da soma, no kernel NumPy
+    if return_per_charge:
+        return _e_field_numpy(points, pos_arr, q_arr, return_per_charge=True)
+    kernel = _numba_kernel()
+    if kernel is not None:
+        return kernel(np.ascontiguousarray(points), pos_arr, q_arr)
+    return _e_field_numpy(points, pos_arr, q_arr)
+
+def _e_field_exact(points: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray) -> np.ndarray:
+    # Sem ε²: valores mostrados no ponto de teste; cargas a r < 1e-8 não contribuem
+    r = points[:, None, :] - pos_arr[None, :, :]
+    dist = np.sqrt((r * r).sum(-1))
+    inv_r3 = np.zeros_like(dist)
+    np.divide(1.0, dist**3, out=inv_r3, where=dist >= 1e-8)
+    return (k_e * q_arr[None, :, None] * inv_r3[:, :, None] * r).sum(axis=1)
+
+def potential(points: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray) -> np.ndarray:
+    # Exato, como _e_field_exact (só é usado no ponto de teste)
+    r = points[:, None, :] - pos_arr[None, :, :]
+    dist = np.sqrt((r * r).sum(-1))
+    inv_r = np.zeros_like(dist)
+    np.divide(1.0, dist, out=inv_r, where=dist >= 1e-8)
+    return np.sum(k_e * q_arr * inv_r, axis=1)
+
+def cube_points(lo: float, hi: float, n: int) -> np.ndarray:
+    # Grelha esparsa (ogrid) materializada uma única vez em (n³, 3);
+    # (j, i, k) mantém a ordem 'xy' do meshgrid, de que depende o [::4]
+    i, j, k = np.ogrid[lo:hi:n*1j, lo:hi:n*1j, lo:hi:n*1j]
+    return np.stack(np.broadcast_arrays(j, i, k), -1).reshape(-1, 3)
+
+def _unit_field(points: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray) -> np.ndarray:
+    E = e_field(points, pos_arr, q_arr)
+    norm = np.linalg.norm(E, axis=1, keepdims=True)
+    u = np.zeros_like(E)
+    np.divide(E, norm, out=u, where=norm > 1e-8)
+    return u
+
+def rk4_lines(starts: np.ndarray, pos_arr: np.ndarray, q_arr: np.ndarray, length: float, n_points: int, substeps: int = 2) -> np.ndarray:
+    # RK4 de passo fixo, vetorizado sobre todas as linhas: devolve (T, N, 3)
+    dt = length / ((n_points - 1) * substeps)
+    y = starts.copy()
+    traj = np.empty((n_points,) + y.shape, dtype=y.dtype)
+    traj[0] = y
+    for s in range(1, n_points):
+        for _ in range(substeps):
+            k1 = _unit_field(y, pos_arr, q_arr)
+            k2 = _unit_field(y + 0.5 * dt * k1, pos_arr, q_arr)
+            k3 = _unit_field(y + 0.5 * dt * k2, pos_arr, q_arr)
+            k4 = _unit_field(y + dt * k3, pos_arr, q_arr)
+            y = y + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        traj[s] = y
+    return traj
+
+# Cálculos em cache: chaves em bytes para só recalcular quando as cargas mudam
+def _from_bytes(pos_bytes: bytes, q_bytes: bytes):
+    return np.frombuffer(pos_bytes).reshape(-1, 3), np.frombuffer(q_bytes)
+
+@st.cache_data(show_spinner=False)
+def compute_all(pos_bytes: bytes, q_bytes: bytes, energy_n: int, viz_n: int) -> dict:
+    # Energia e grid de visualização numa só entrada em cache
+    pos_arr, q_arr = _from_bytes(pos_bytes, q_bytes)
+    E_energy = e_field(cube_points(-2, 2, energy_n), pos_arr, q_arr)
+    dV = ((4) / (energy_n - 1))**3
+    U = (epsilon_0 / 2) * np.einsum('ij,ij->', E_energy, E_energy) * dV  # Σ |E|², sem sqrt nem quadrado
+    # U é uma estimativa suavizada: com ε² fica abaixo do valor sem suavização
+
+    # Visualização em float32 (a energia fica em float64)
+    pos_arr, q_arr = pos_arr.astype(np.float32), q_arr.astype(np.float32)
+    points = cube_points(-1.5, 1.5, viz_n)[::4].astype(np.float32)
+    E_per_charge, E_grid = e_field(points, pos_arr, q_arr, return_per_charge=True)
+    return dict(U=U, points=points, E_grid=E_grid, E_per_charge=E_per_charge)
+
+@st.cache_data(show_spinner=False)
+def compute_lines(pos_bytes: bytes, q_bytes: bytes, num_lines: int) -> tuple:
+    pos_arr, q_arr = _from_bytes(pos_bytes, q_bytes)
+    pos_arr, q_arr = pos_arr.astype(np.float32), q_arr.astype(np.float32)
+    # Sementes fixas: as linhas não "saltam" entre reruns
+    rng = np.random.default_rng(seed=42)
+    starts = rng.uniform(-1.2, 1.2, (num_lines, 3)).astype(np.float32)
+    traj = rk4_lines(starts, pos_arr, q_arr, 5.0, 100)
+    # Uma única trace: linhas separadas por NaN
+    lx, ly, lz = np.concatenate([traj, np.full((1,) + starts.shape, np.nan, dtype=starts.dtype)]).transpose(1, 0, 2).reshape(-1, 3).T
+    return lx, ly, lz
+
+# Energia U (aproximação numérica) e malha para visualização
+field = compute_all(pos_arr.tobytes(), q_arr.tobytes(), 20, 15)
+U = field["U"]
+points = field["points"]
 
 # Figura 3D
-fig = go.Figure()
+traces = []  # A figura é criada uma única vez, com todas as traces
 
 # Linhas de campo
-starts = np.random.uniform(-1.2, 1.2, (num_lines, 3))
-for start in starts:
-    def ode(t, r):
-        E = e_total(r)
-        norm = np.linalg.norm(E)
-        return E / norm if norm > 1e-8 else np.zeros(3)
-    sol = solve_ivp(ode, [0, 5], start, t_eval=np.linspace(0, 5, 100), rtol=1e-5)
-    line = sol.y.T
-    fig.add_trace(go.Scatter3d(x=line[:,0], y=line[:,1], z=line[:,2], mode='lines', line=dict(color='#007AFF', width=2), showlegend=False))
+lx, ly, lz = compute_lines(pos_arr.tobytes(), q_arr.tobytes(), num_lines)
+traces.append(go.Scatter3d(x=lx, y=ly, z=lz, mode='lines', line=dict(color='#007AFF', width=2), showlegend=False))
 
 # Vetores E total
-E_grid = np.array([e_total(p) for p in points_v[::4]])
-norm_E = np.linalg.norm(E_grid, axis=1)
-scale = 0.8 / (norm_E.max() + 1e-8)
-fig.add_trace(go.Cone(x=points_v[::4,0], y=points_v[::4,1], z=points_v[::4,2], u=E_grid[:,0]*scale, v=E_grid[:,1]*scale, w=E_grid[:,2]*scale, colorscale='Blues', sizemode='absolute', sizeref=0.2, showscale=False, name="E total"))
+E_grid = field["E_grid"]
+# Só o máximo de |E| interessa: uma única sqrt em vez de N
+norm_E_max = np.sqrt(np.einsum('ij,ij->i', E_grid, E_grid).max())
+scale = 0.8 / (norm_E_max + 1e-8)
+traces.append(go.Cone(x=points[:,0], y=points[:,1], z=points[:,2], u=E_grid[:,0]*scale, v=E_grid[:,1]*scale, w=E_grid[:,2]*scale, colorscale='Blues', sizemode='absolute', sizeref=0.2, showscale=False, name="E total"))
 
 # Superposição individual
 if show_individual:
     colors = ['#FF3B30', '#34C759', '#FFCC00', '#AF52DE', '#FF9500']
-    for i, c in enumerate(charges):
-        E_ind = np.array([e_individual(p, c) for p in points_v[::4]])
-        fig.add_trace(go.Cone(x=points_v[::4,0], y=points_v[::4,1], z=points_v[::4,2], u=E_ind[:,0]*scale, v=E_ind[:,1]*scale, w=E_ind[:,2]*scale, colorscale=[[0, colors[i]], [1, colors[i]]], sizemode='absolute', sizeref=0.2, name=f"E de q{i+1}", opacity=0.7))
+    E_per_charge = field["E_per_charge"]
+    for i in range(num_charges):
+        E_ind = E_per_charge[:, i, :]  # vista, sem recalcular
+        traces.append(go.Cone(x=points[:,0], y=points[:,1], z=points[:,2], u=E_ind[:,0]*scale, v=E_ind[:,1]*scale, w=E_ind[:,2]*scale, colorscale=[[0, colors[i]], [1, colors[i]]], sizemode='absolute', sizeref=0.2, name=f"E de q{i+1}", opacity=0.7))
 
 # Cargas
-for i, c in enumerate(charges):
-    color = '#FF3B30' if c["q"] > 0 else '#007AFF'
-    size = 10 + abs(c["q"] * 1e6) * 3
-    fig.add_trace(go.Scatter3d(x=[c["pos"][0]], y=[c["pos"][1]], z=[c["pos"][2]], mode='markers+text', marker=dict(size=size, color=color), text=f"q{i+1}", textposition="top center"))
+for i, (p, q) in enumerate(zip(pos_arr, q_arr)):
+    color = '#FF3B30' if q > 0 else '#007AFF'
+    size = 10 + abs(q * 1e6) * 3
+    traces.append(go.Scatter3d(x=[p[0]], y=[p[1]], z=[p[2]], mode='markers+text', marker=dict(size=size, color=color), text=f"q{i+1}", textposition="top center"))
 
 # Ponto de teste
 if show_test:
-    E_test = e_total(test_pos)
+    E_test = _e_field_exact(test_pos[None, :], pos_arr, q_arr)[0]  # Um só ponto, lei de Coulomb exata
     F_test = test_q * E_test
-    V_test = potential(test_pos, charges)
-    fig.add_trace(go.Scatter3d(x=[test_pos[0]], y=[test_pos[1]], z=[test_pos[2]], mode='markers', marker=dict(size=10, color='#FFCC00', symbol='diamond'), name='Ponto teste'))
-    fig.add_trace(go.Cone(x=[test_pos[0]], y=[test_pos[1]], z=[test_pos[2]], u=[F_test[0]*scale*2], v=[F_test[1]*scale*2], w=[F_test[2]*scale*2], colorscale='Greens', sizemode='absolute', sizeref=0.2, name='F = q E'))
+    V_test = potential(test_pos[None, :], pos_arr, q_arr)[0]
+    traces.append(go.Scatter3d(x=[test_pos[0]], y=[test_pos[1]], z=[test_pos[2]], mode='markers', marker=dict(size=10, color='#FFCC00', symbol='diamond'), name='Ponto teste'))
+    traces.append(go.Cone(x=[test_pos[0]], y=[test_pos[1]], z=[test_pos[2]], u=[F_test[0]*scale*2], v=[F_test[1]*scale*2], w=[F_test[2]*scale*2], colorscale='Greens', sizemode='absolute', sizeref=0.2, name='F = q E'))
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Campo |E| no ponto", f"{np.linalg.norm(E_test):.2e} N/C")
@@ -138,6 +234,7 @@ col_u1, col_u2 = st.columns(2)
 col_u1.metric("Energia do campo U ≈", f"{U:.2e} J")
 col_u2.latex(r"U = \frac{\epsilon_0}{2} \int E^2 dV")
 
+fig = go.Figure(data=traces)
 fig.update_layout(scene=dict(aspectmode='cube', bgcolor='white', xaxis=dict(showgrid=False, zeroline=False, showticklabels=False), yaxis=dict(showgrid=False, zeroline=False, showticklabels=False), zaxis=dict(showgrid=False, zeroline=False, showticklabels=False)), height=700, margin=dict(l=0, r=0, b=0, t=0))
 
 st.plotly_chart(fig, use_container_width=True)
@@ -153,4 +250,6 @@ Pergunte: o que acontece no centro de um dipolo? Experimente e descubra.
 if st.button("Exportar imagem 4K"):
     st.plotly_chart(fig.to_image(format="png", scale=4))
 
-st.download_button("Exportar dados CSV", data=pd.DataFrame([{"x": p[0], "y": p[1], "z": p[2], "Ex": e[0], "Ey": e[1], "Ez": e[2]} for p, e in zip(points_v[::4], E_grid)]).to_csv(), file_name="campos.csv")
\ No newline at end of file
+# Colunas diretamente dos arrays, sem um dict Python por linha
+df = pd.DataFrame({"x": points[:, 0], "y": points[:, 1], "z": points[:, 2], "Ex": E_grid[:, 0], "Ey": E_grid[:, 1], "Ez": E_grid[:, 2]})
+st.download_button("Exportar dados CSV", data=df.to_csv(index=False), file_name="campos.csv")
\ No newline at end of file
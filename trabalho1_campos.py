@@ -1,22 +1,29 @@
+import math
 import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
-from scipy.integrate import solve_ivp
 import pandas as pd
 
+try:
+    from numba import njit, prange, cuda
+    NUMBA_DISPONIVEL = True
+    CUDA_DISPONIVEL = cuda.is_available()  # GPU só é usada se existir driver
+except ImportError:  # Numba é opcional; sem ele usa-se o kernel NumPy
+    NUMBA_DISPONIVEL = False
+    CUDA_DISPONIVEL = False
+
 # ========== CONSTANTES FÍSICAS ==========
 K_E = 8.9875517923e9  # N·m²/C²
 EPSILON_0 = 8.8541878128e-12  # F/m
 
-# ========== CONFIGURAÇÃO DO STREAMLIT ==========
-st.set_page_config(
-    page_title="Simulação de Campo Elétrico 3D",
-    layout="wide",
-    page_icon="⚡"
-)
+# Suavização de Plummer: |r|² -> |r|² + ε², com ε = 0.05 m.
+# Evita a singularidade junto às cargas sem ramos no ciclo interno.
+# Serve o desenho (grid e linhas); a energia mostrada é, por isso, uma
+# estimativa suavizada, abaixo do valor sem suavização.
+EPS2 = 0.05**2  # m²
 
-# ========== CSS PERSONALIZADO ==========
-st.markdown("""
+# ========== TEXTOS ESTÁTICOS ==========
+CSS_PERSONALIZADO = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -39,7 +46,50 @@ st.markdown("""
         border: 1px solid #E5E7EB;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+TEORIA_MD = """
+### Campo Elétrico de Cargas Pontuais
+
+O campo elétrico num ponto do espaço devido a uma carga pontual é dado por:
+
+$$
+\\vec{E} = \\frac{1}{4\\pi\\epsilon_0} \\frac{q}{r^2} \\hat{r}
+$$
+
+Para múltiplas cargas, aplica-se o **princípio da superposição**:
+
+$$
+\\vec{E}_{\\text{total}} = \\sum_{i=1}^{n} \\vec{E}_i
+$$
+
+As linhas de campo:
+1. Saem de cargas positivas e entram em cargas negativas
+2. A densidade é proporcional à intensidade do campo
+3. Nunca se cruzam
+"""
+
+INSTRUCOES_MD = """
+1. **Rodar**: Use o mouse para rodar a visualização 3D
+2. **Zoom**: Use a roda do mouse para zoom in/out
+3. **Cargas**: Clique nas cargas na legenda para mostrar/esconder
+4. **Reset**: Use o botão na barra lateral para resetar
+"""
+
+@st.cache_resource
+def _blocos_estaticos():
+    """CSS e textos fixos da página, criados uma única vez por processo."""
+    return {'css': CSS_PERSONALIZADO, 'teoria': TEORIA_MD, 'instrucoes': INSTRUCOES_MD}
+
+# ========== CONFIGURAÇÃO DO STREAMLIT ==========
+st.set_page_config(
+    page_title="Simulação de Campo Elétrico 3D",
+    layout="wide",
+    page_icon="⚡"
+)
+
+# ========== CSS PERSONALIZADO ==========
+st.markdown(_blocos_estaticos()['css'], unsafe_allow_html=True)
 
 # ========== CABEÇALHO ==========
 st.markdown('<h1 class="main-header">⚡ Simulação 3D de Campo Elétrico</h1>', unsafe_allow_html=True)
@@ -47,51 +97,270 @@ st.markdown("**Trabalho Prático 1 - Visualização de Linhas de Campo Elétrico
 
 # ========== TEORIA ==========
 with st.expander("📚 Fundamentos Teóricos", expanded=False):
-    st.markdown("""
-    ### Campo Elétrico de Cargas Pontuais
+    st.markdown(_blocos_estaticos()['teoria'])
+
+# ========== FUNÇÃO DE CÁLCULO DO CAMPO ==========
+def _campo_numpy(pontos, posicoes, valores_q):
+    """Kernel NumPy: broadcasting pontos × cargas, (N, M, 3)."""
+    vetor_r = pontos[:, None, :] - posicoes[None, :, :]
+    distancia2 = (vetor_r * vetor_r).sum(axis=-1) + EPS2
+    inv_r3 = distancia2**-1.5
     
-    O campo elétrico num ponto do espaço devido a uma carga pontual é dado por:
+    return (K_E * valores_q[None, :, None] * inv_r3[:, :, None] * vetor_r).sum(axis=1)
+
+@st.cache_resource
+def _kernel_campo():
+    """
+    Define o kernel Numba do campo uma vez por processo.
     
-    $$
-    \\vec{E} = \\frac{1}{4\\pi\\epsilon_0} \\frac{q}{r^2} \\hat{r}
-    $$
+    O Streamlit reexecuta o script a cada interação: um @njit ao nível do
+    módulo criaria um dispatcher novo, recarregado da cache em disco, em
+    cada rerun. O ciclo sobre as cargas fica inline, porque um kernel que
+    chame outro definido aqui dentro não entra na cache em disco.
     
-    Para múltiplas cargas, aplica-se o **princípio da superposição**:
+    Returns:
+        Kernel compilado, ou None sem Numba
+    """
+    if not NUMBA_DISPONIVEL:
+        return None
     
-    $$
-    \\vec{E}_{\\text{total}} = \\sum_{i=1}^{n} \\vec{E}_i
-    $$
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _campo_numba(pontos, posicoes, valores_q):
+        """Kernel compilado: campo em N pontos, em paralelo sobre os pontos."""
+        E = np.zeros_like(pontos)  # Mesmo dtype dos pontos (float32 ou float64)
+        for n in prange(pontos.shape[0]):
+            for i in range(posicoes.shape[0]):
+                dx = pontos[n, 0] - posicoes[i, 0]
+                dy = pontos[n, 1] - posicoes[i, 1]
+                dz = pontos[n, 2] - posicoes[i, 2]
+                distancia2 = dx*dx + dy*dy + dz*dz + EPS2
+                
+                fator = K_E * valores_q[i] * distancia2**-1.5
+                E[n, 0] += fator * dx
+                E[n, 1] += fator * dy
+                E[n, 2] += fator * dz
+        return E
     
-    As linhas de campo:
-    1. Saem de cargas positivas e entram em cargas negativas
-    2. A densidade é proporcional à intensidade do campo
-    3. Nunca se cruzam
-    """)
+    return _campo_numba
 
-# ========== FUNÇÃO DE CÁLCULO DO CAMPO ==========
-def calcular_campo_eletrico(posicao, cargas):
+def calcular_campo_eletrico(pontos, posicoes, valores_q):
     """
-    Calcula o campo elétrico num ponto do espaço.
+    Calcula o campo elétrico num conjunto de pontos do espaço.
+    
+    Usa o kernel compilado com Numba quando disponível e, caso
+    contrário, o kernel NumPy vetorizado.
     
     Args:
-        posicao: array [x, y, z] com coordenadas do ponto
-        cargas: lista de dicionários com 'q' e 'pos'
+        pontos: array (N, 3) com as coordenadas dos pontos
+        posicoes: array (M, 3) com as posições das cargas
+        valores_q: array (M,) com os valores das cargas em Coulombs
     
     Returns:
-        Vetor campo elétrico [Ex, Ey, Ez]
+        Array (N, 3) com os vetores campo elétrico [Ex, Ey, Ez], com o
+        mesmo dtype dos pontos
+    """
+    kernel = _kernel_campo()
+    if kernel is not None:
+        return kernel(np.ascontiguousarray(pontos), posicoes, valores_q)
+    return _campo_numpy(pontos, posicoes, valores_q)
+
+def grade_cubica(minimo, maximo, n):
     """
-    E = np.zeros(3)
+    Gera os pontos de uma grelha cúbica regular.
     
-    for carga in cargas:
-        vetor_r = posicao - carga['pos']
-        distancia = np.linalg.norm(vetor_r)
-        
-        if distancia < 0.05:  # Evita singularidade
-            continue
+    Usa uma grelha esparsa (np.ogrid) e materializa-a uma única vez,
+    sem as três matrizes (n, n, n) intermédias do np.meshgrid.
+    
+    Returns:
+        Array (n³, 3) com as coordenadas dos pontos
+    """
+    eixo = slice(minimo, maximo, n * 1j)
+    i, j, k = np.ogrid[eixo, eixo, eixo]
+    return np.stack(np.broadcast_arrays(i, j, k), axis=-1).reshape(-1, 3)
+
+def direcao_campo(pontos, posicoes, valores_q):
+    """Vetor unitário na direção do campo em cada ponto (zero onde E ≈ 0)."""
+    E = calcular_campo_eletrico(pontos, posicoes, valores_q)
+    norma = np.linalg.norm(E, axis=1, keepdims=True)
+    direcao = np.zeros_like(E)
+    np.divide(E, norma, out=direcao, where=norma > 1e-6)
+    return direcao
+
+# Abaixo disto, compilar e lançar o kernel na GPU custa mais do que o RK4
+# no CPU (a app usa no máximo 6 cargas × 12 linhas)
+MIN_LINHAS_GPU = 4096
+
+@st.cache_resource
+def _kernel_rk4_cuda():
+    """
+    Compila os kernels CUDA das linhas de campo uma vez por processo.
+    
+    O @cuda.jit não tem cache em disco: ao nível do módulo seria redecorado,
+    e recompilado, em cada rerun do script.
+    
+    Returns:
+        Kernel _rk4_cuda, pronto a lançar
+    """
+    @cuda.jit(device=True)
+    def _direcao_cuda(x, y, z, posicoes, valores_q):
+        """Vetor unitário do campo num ponto, calculado numa thread da GPU."""
+        ex = ey = ez = 0.0
+        for i in range(posicoes.shape[0]):
+            dx = x - posicoes[i, 0]
+            dy = y - posicoes[i, 1]
+            dz = z - posicoes[i, 2]
+            distancia2 = dx*dx + dy*dy + dz*dz + EPS2
             
-        E += (K_E * carga['q'] / distancia**3) * vetor_r
+            fator = K_E * valores_q[i] * distancia2**-1.5
+            ex += fator * dx
+            ey += fator * dy
+            ez += fator * dz
+        
+        norma = math.sqrt(ex*ex + ey*ey + ez*ez)
+        if norma > 1e-6:
+            return ex / norma, ey / norma, ez / norma
+        return 0.0, 0.0, 0.0
+    
+    @cuda.jit
+    def _rk4_cuda(trajetorias, posicoes, valores_q, dt, subpassos):
+        """Uma thread por linha: integra com RK4 e escreve em trajetorias (T, N, 3)."""
+        n = cuda.grid(1)
+        if n >= trajetorias.shape[1]:
+            return
+        
+        x, y, z = trajetorias[0, n, 0], trajetorias[0, n, 1], trajetorias[0, n, 2]
+        for k in range(1, trajetorias.shape[0]):
+            for _ in range(subpassos):
+                k1x, k1y, k1z = _direcao_cuda(x, y, z, posicoes, valores_q)
+                k2x, k2y, k2z = _direcao_cuda(x + 0.5*dt*k1x, y + 0.5*dt*k1y, z + 0.5*dt*k1z, posicoes, valores_q)
+                k3x, k3y, k3z = _direcao_cuda(x + 0.5*dt*k2x, y + 0.5*dt*k2y, z + 0.5*dt*k2z, posicoes, valores_q)
+                k4x, k4y, k4z = _direcao_cuda(x + dt*k3x, y + dt*k3y, z + dt*k3z, posicoes, valores_q)
+                x += dt / 6 * (k1x + 2*k2x + 2*k3x + k4x)
+                y += dt / 6 * (k1y + 2*k2y + 2*k3y + k4y)
+                z += dt / 6 * (k1z + 2*k2z + 2*k3z + k4z)
+            trajetorias[k, n, 0] = x
+            trajetorias[k, n, 1] = y
+            trajetorias[k, n, 2] = z
+    
+    return _rk4_cuda
+
+def _rk4_cpu(trajetorias, posicoes, valores_q, dt, subpassos):
+    """RK4 no CPU, vetorizado sobre as N linhas; preenche trajetorias (T, N, 3)."""
+    pos = trajetorias[0]
+    for k in range(1, trajetorias.shape[0]):
+        for _ in range(subpassos):
+            k1 = direcao_campo(pos, posicoes, valores_q)
+            k2 = direcao_campo(pos + 0.5 * dt * k1, posicoes, valores_q)
+            k3 = direcao_campo(pos + 0.5 * dt * k2, posicoes, valores_q)
+            k4 = direcao_campo(pos + dt * k3, posicoes, valores_q)
+            pos = pos + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        trajetorias[k] = pos
+    return trajetorias
+
+def integrar_linhas_campo(posicoes, valores_q, n_linhas=12, comprimento=8.0, n_pontos=50, subpassos=4, semente=42):
+    """
+    Integra as linhas de campo que partem das cargas positivas.
+    
+    Usa RK4 de passo fixo, vetorizado sobre todas as linhas: cada passo
+    avalia o campo nos N pontos de uma só vez. Com uma GPU CUDA disponível
+    e pelo menos MIN_LINHAS_GPU linhas, cada linha é integrada numa thread
+    própria.
+    
+    Args:
+        n_linhas: linhas por carga positiva
+        comprimento: comprimento de arco de cada linha (m)
+        n_pontos: pontos guardados por linha
+        subpassos: passos RK4 entre pontos guardados
+        semente: semente das direções iniciais (linhas estáveis entre reruns)
+    
+    Returns:
+        Tuplo (x, y, z) com todas as linhas concatenadas e separadas por
+        NaN, ou None se não houver linhas
+    """
+    if not np.any(valores_q > 0):
+        return None
+    
+    # Gerar pontos iniciais numa pequena esfera à volta de cada carga positiva
+    rng = np.random.default_rng(semente)
+    pontos_iniciais = []
+    for posicao_carga in posicoes[valores_q > 0]:  # Linhas saem de cargas positivas
+        direcoes = rng.standard_normal((n_linhas, 3))
+        direcoes /= np.linalg.norm(direcoes, axis=1, keepdims=True)
+        pontos_iniciais.append(posicao_carga + 0.2 * direcoes)
+    pos = np.concatenate(pontos_iniciais).astype(np.float32)  # (N, 3)
     
-    return E
+    dt = comprimento / ((n_pontos - 1) * subpassos)
+    trajetorias = np.empty((n_pontos,) + pos.shape, dtype=pos.dtype)  # (T, N, 3)
+    trajetorias[0] = pos
+    
+    if CUDA_DISPONIVEL and pos.shape[0] >= MIN_LINHAS_GPU:
+        d_trajetorias = cuda.to_device(trajetorias)
+        blocos = (pos.shape[0] + 127) // 128
+        _kernel_rk4_cuda()[blocos, 128](d_trajetorias, cuda.to_device(posicoes), cuda.to_device(valores_q), dt, subpassos)
+        trajetorias = d_trajetorias.copy_to_host()
+    else:
+        trajetorias = _rk4_cpu(trajetorias, posicoes, valores_q, dt, subpassos)
+    
+    # Linhas concatenadas, separadas por NaN (uma única trace no Plotly)
+    separador = np.full((1,) + pos.shape, np.nan, dtype=pos.dtype)
+    pontos_linhas = np.concatenate([trajetorias, separador]).transpose(1, 0, 2).reshape(-1, 3)
+    return tuple(pontos_linhas.T)
+
+# ========== CÁLCULOS EM CACHE ==========
+# As cargas entram como bytes (hashable): o Streamlit só recalcula quando
+# as cargas ou o grid mudam, e não quando mudam opções só visuais.
+# As linhas de campo têm cache própria: ligá-las não recalcula o grid.
+# O grid e as linhas usam float32 (o Plotly desenha em float32 de qualquer
+# forma); só a energia, uma soma sobre todo o volume, fica em float64.
+def _arrays_das_cargas(posicoes_bytes, valores_q_bytes):
+    """Reconstrói os arrays de posições (M, 3) e de cargas (M,)."""
+    return np.frombuffer(posicoes_bytes).reshape(-1, 3), np.frombuffer(valores_q_bytes)
+
+@st.cache_data(show_spinner=False)
+def calcular_energia(posicoes_bytes, valores_q_bytes):
+    """
+    Energia aproximada do campo, U = ε₀/2 ∫ E² dV, numa grelha 8×8×8 em [-2, 2]³.
+    
+    Estimativa suavizada: o campo usa |r|² + ε² (ver EPS2).
+    """
+    posicoes, valores_q = _arrays_das_cargas(posicoes_bytes, valores_q_bytes)
+    
+    E_energia = calcular_campo_eletrico(grade_cubica(-2, 2, 8), posicoes, valores_q)
+    
+    # Σ |E|² sem criar o array temporário E * E
+    energia_total = np.einsum('ij,ij->', E_energia, E_energia)
+    
+    return 0.5 * EPSILON_0 * energia_total * (4/7)**3  # Fator de volume aproximado
+
+@st.cache_data(show_spinner=False)
+def calcular_tudo(posicoes_bytes, valores_q_bytes, densidade_grid):
+    """
+    Calcula numa só chamada em cache a energia e o campo no grid de visualização.
+    
+    A energia continua com cache própria (só depende das cargas), pelo que
+    mudar a densidade do grid não a recalcula.
+    
+    Returns:
+        Dicionário com 'energia' (J), 'pontos_grid' (N, 3) e 'E_grid' (N, 3)
+    """
+    posicoes, valores_q = _arrays_das_cargas(posicoes_bytes, valores_q_bytes)
+    posicoes = posicoes.astype(np.float32)
+    valores_q = valores_q.astype(np.float32)
+    
+    pontos_grid = grade_cubica(-3, 3, densidade_grid).astype(np.float32)
+    E_grid = calcular_campo_eletrico(pontos_grid, posicoes, valores_q)
+    
+    return {
+        'energia': calcular_energia(posicoes_bytes, valores_q_bytes),
+        'pontos_grid': pontos_grid,
+        'E_grid': E_grid
+    }
+
+@st.cache_data(show_spinner=False)
+def calcular_linhas(posicoes_bytes, valores_q_bytes):
+    """Linhas de campo (tuplo x, y, z ou None) a partir das cargas positivas."""
+    posicoes, valores_q = _arrays_das_cargas(posicoes_bytes, valores_q_bytes)
+    return integrar_linhas_campo(posicoes.astype(np.float32), valores_q.astype(np.float32))
 
 # ========== BARRA LATERAL ==========
 with st.sidebar:
@@ -106,7 +375,9 @@ with st.sidebar:
         help="Quantas cargas pontuais deseja colocar no espaço?"
     )
     
-    cargas = []
+    # Cargas em formato SoA: posições (M, 3) e valores em µC
+    posicoes = np.empty((numero_cargas, 3))
+    valores_uC = []
     
     # Configuração individual de cada carga
     for i in range(numero_cargas):
@@ -136,14 +407,8 @@ with st.sidebar:
             with col_z:
                 z = st.slider(f"Z", -3.0, 3.0, 0.0, key=f"z_{i}")
             
-            # Converter para Coulombs e armazenar
-            q_coulomb = valor * 1e-6
-            cargas.append({
-                'q': q_coulomb,
-                'pos': np.array([x, y, z]),
-                'valor_µC': valor,
-                'id': i+1
-            })
+            posicoes[i] = (x, y, z)
+            valores_uC.append(valor)
     
     st.divider()
     
@@ -182,20 +447,15 @@ with st.sidebar:
         st.rerun()
 
 # ========== CÁLCULOS E MÉTRICAS ==========
-# Calcular carga total
-carga_total = sum(c['q'] for c in cargas) * 1e6  # Convert to µC
+# Converter para Coulombs
+valores_q = np.array(valores_uC, dtype=np.float64) * 1e-6
 
-# Calcular energia aproximada do campo
-pontos_amostra = np.linspace(-2, 2, 8)
-energia_total = 0
-
-for x in pontos_amostra:
-    for y in pontos_amostra:
-        for z in pontos_amostra:
-            E = calcular_campo_eletrico(np.array([x, y, z]), cargas)
-            energia_total += np.dot(E, E)
+# Calcular carga total
+carga_total = valores_q.sum() * 1e6  # Convert to µC
 
-energia_total *= 0.5 * EPSILON_0 * (4/7)**3  # Fator de volume aproximado
+# Energia e campo no grid, numa só chamada em cache
+resultado = calcular_tudo(posicoes.tobytes(), valores_q.tobytes(), densidade_grid)
+energia_total = resultado['energia']
 
 # Mostrar métricas
 col1, col2, col3 = st.columns(3)
@@ -216,34 +476,21 @@ with col3:
     st.markdown('</div>', unsafe_allow_html=True)
 
 # ========== VISUALIZAÇÃO 3D ==========
-fig = go.Figure()
-
-# Criar grid para vetores do campo
-grid_valores = np.linspace(-3, 3, densidade_grid)
-X, Y, Z = np.meshgrid(grid_valores, grid_valores, grid_valores)
-pontos_grid = np.vstack([X.ravel(), Y.ravel(), Z.ravel()]).T
+traces = []  # A figura é criada uma única vez, com todas as traces
 
-# Calcular campo em todos os pontos do grid
-vetores_campo = []
-intensidades = []
-posicoes_validas = []
+pontos_grid = resultado['pontos_grid']
+E_grid = resultado['E_grid']
 
-for ponto in pontos_grid:
-    E = calcular_campo_eletrico(ponto, cargas)
-    intensidade = np.linalg.norm(E)
-    
-    if intensidade > 1e-3 and intensidade < 1e8:  # Filtrar valores extremos
-        vetores_campo.append(E / intensidade)  # Vetor unitário
-        intensidades.append(intensidade)
-        posicoes_validas.append(ponto)
+# Filtrar os pontos do grid para os vetores do campo (máscara booleana)
+intensidades = np.linalg.norm(E_grid, axis=1)
+mascara = (intensidades > 1e-3) & (intensidades < 1e8)  # Filtrar valores extremos
+posicoes_validas = pontos_grid[mascara]
+intensidades = intensidades[mascara]
+vetores_campo = E_grid[mascara] / intensidades[:, None]  # Vetores unitários
 
-if posicoes_validas and mostrar_vetores:
-    posicoes_validas = np.array(posicoes_validas)
-    vetores_campo = np.array(vetores_campo)
-    intensidades = np.array(intensidades)
-    
+if len(posicoes_validas) and mostrar_vetores:
     # Adicionar cones representando o campo
-    fig.add_trace(go.Cone(
+    traces.append(go.Cone(
         x=posicoes_validas[:, 0],
         y=posicoes_validas[:, 1],
         z=posicoes_validas[:, 2],
@@ -259,64 +506,42 @@ if posicoes_validas and mostrar_vetores:
     ))
 
 # Adicionar linhas de campo (RK4)
-if mostrar_linhas:
-    for carga in cargas:
-        if carga['q'] > 0:  # Linhas saem de cargas positivas
-            # Gerar pontos iniciais em uma pequena esfera
-            n_linhas = 12
-            for _ in range(n_linhas):
-                # Ponto inicial aleatório perto da carga
-                direcao = np.random.randn(3)
-                direcao /= np.linalg.norm(direcao)
-                ponto_inicial = carga['pos'] + 0.2 * direcao
-                
-                # Integrar trajetória
-                def equacao_diferencial(t, pos):
-                    E = calcular_campo_eletrico(pos, cargas)
-                    norma = np.linalg.norm(E)
-                    return E / norma if norma > 1e-6 else [0, 0, 0]
-                
-                try:
-                    solucao = solve_ivp(
-                        equacao_diferencial,
-                        [0, 8],
-                        ponto_inicial,
-                        t_eval=np.linspace(0, 8, 50),
-                        method='RK45'
-                    )
-                    
-                    fig.add_trace(go.Scatter3d(
-                        x=solucao.y[0],
-                        y=solucao.y[1],
-                        z=solucao.y[2],
-                        mode='lines',
-                        line=dict(color='#666666', width=2),
-                        opacity=0.4,
-                        showlegend=False
-                    ))
-                except:
-                    pass
+linhas = calcular_linhas(posicoes.tobytes(), valores_q.tobytes()) if mostrar_linhas else None
+if linhas is not None:
+    x_linhas, y_linhas, z_linhas = linhas
+    
+    traces.append(go.Scatter3d(
+        x=x_linhas,
+        y=y_linhas,
+        z=z_linhas,
+        mode='lines',
+        line=dict(color='#666666', width=2),
+        opacity=0.4,
+        showlegend=False
+    ))
 
 # Adicionar as cargas (esferas coloridas)
-for carga in cargas:
-    cor = "#EF4444" if carga['q'] > 0 else "#3B82F6"  # Vermelho/Azul
-    tamanho = 15 + abs(carga['valor_µC']) * 3
-    
-    fig.add_trace(go.Scatter3d(
-        x=[carga['pos'][0]],
-        y=[carga['pos'][1]],
-        z=[carga['pos'][2]],
+for i, (posicao, valor) in enumerate(zip(posicoes, valores_uC)):
+    cor = "#EF4444" if valor > 0 else "#3B82F6"  # Vermelho/Azul
+    tamanho = 15 + abs(valor) * 3
+    
+    traces.append(go.Scatter3d(
+        x=[posicao[0]],
+        y=[posicao[1]],
+        z=[posicao[2]],
         mode='markers+text',
         marker=dict(
             size=tamanho,
             color=cor,
             line=dict(color='white', width=2)
         ),
-        text=[f"Q{carga['id']}"],
+        text=[f"Q{i+1}"],
         textposition="top center",
-        name=f"Carga {carga['id']} ({carga['valor_µC']} µC)"
+        name=f"Carga {i+1} ({valor} µC)"
     ))
 
+fig = go.Figure(data=traces)
+
 # Configurar layout da cena 3D
 fig.update_layout(
     scene=dict(
@@ -346,13 +571,13 @@ st.plotly_chart(fig, use_container_width=True)
 # ========== TABELA DE DADOS ==========
 st.subheader("📊 Dados das Cargas")
 dados_cargas = pd.DataFrame([{
-    'Carga': f"Q{c['id']}",
-    'Valor (µC)': c['valor_µC'],
-    'Posição X': f"{c['pos'][0]:.2f} m",
-    'Posição Y': f"{c['pos'][1]:.2f} m",
-    'Posição Z': f"{c['pos'][2]:.2f} m",
-    'Sinal': 'Positiva' if c['q'] > 0 else 'Negativa'
-} for c in cargas])
+    'Carga': f"Q{i+1}",
+    'Valor (µC)': valor,
+    'Posição X': f"{posicao[0]:.2f} m",
+    'Posição Y': f"{posicao[1]:.2f} m",
+    'Posição Z': f"{posicao[2]:.2f} m",
+    'Sinal': 'Positiva' if valor > 0 else 'Negativa'
+} for i, (posicao, valor) in enumerate(zip(posicoes, valores_uC))])
 
 st.dataframe(dados_cargas, use_container_width=True)
 
@@ -372,12 +597,7 @@ with col_export1:
 with col_export2:
     # Instruções
     with st.expander("💡 Como usar"):
-        st.markdown("""
-        1. **Rodar**: Use o mouse para rodar a visualização 3D
-        2. **Zoom**: Use a roda do mouse para zoom in/out
-        3. **Cargas**: Clique nas cargas na legenda para mostrar/esconder
-        4. **Reset**: Use o botão na barra lateral para resetar
-        """)
+        st.markdown(_blocos_estaticos()['instrucoes'])
 
 st.divider()
 st.caption("Trabalho Prático 1 - Eletromagnetismo 2025/2026 | Desenvolvido com Python e Plotly")
\ No newline at end of file
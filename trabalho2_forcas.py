@@ -1,8 +1,15 @@
+import math
 import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
 import pandas as pd
 
+try:
+    from numba import njit
+    NUMBA_DISPONIVEL = True
+except ImportError:  # Numba é opcional; sem ele usa-se o kernel NumPy
+    NUMBA_DISPONIVEL = False
+
 # ========== CONSTANTES FÍSICAS ==========
 K_E = 8.9875517923e9  # N·m²/C²
 
@@ -14,7 +21,7 @@ st.set_page_config(
 )
 
 # ========== CSS ==========
-st.markdown("""
+CSS_PERSONALIZADO = """
 <style>
     .main-title {
         text-align: center;
@@ -22,59 +29,163 @@ st.markdown("""
         font-size: 2.2rem;
         margin-bottom: 1rem;
     }
-    .test-charge-box {
-        background: #FEF3C7;
-        border: 2px solid #F59E0B;
-        border-radius: 8px;
-        padding: 1rem;
-        margin-bottom: 1rem;
-    }
-    .fixed-charge-box {
-        background: #F3F4F6;
-        border-radius: 6px;
-        padding: 0.8rem;
-        margin: 0.5rem 0;
-        border-left: 4px solid #10B981;
-    }
-    .metric-card {
-        background: white;
-        padding: 1rem;
-        border-radius: 8px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        border: 1px solid #E5E7EB;
-    }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def _css_personalizado():
+    """CSS fixo da página, criado uma única vez por processo."""
+    return CSS_PERSONALIZADO
+
+st.markdown(_css_personalizado(), unsafe_allow_html=True)
+
+# ========== LAYOUT DO GRÁFICO ==========
+@st.cache_resource
+def _layout_base():
+    """Layout fixo da cena 3D, construído uma única vez por processo (só de leitura)."""
+    return dict(
+        scene=dict(
+            xaxis=dict(
+                title="Eixo X (m)",
+                gridcolor="lightgray",
+                showbackground=True,
+                backgroundcolor="white",
+                range=[-5, 5]
+            ),
+            yaxis=dict(
+                title="Eixo Y (m)",
+                gridcolor="lightgray",
+                showbackground=True,
+                backgroundcolor="white",
+                range=[-5, 5]
+            ),
+            zaxis=dict(
+                title="Eixo Z (m)",
+                gridcolor="lightgray",
+                showbackground=True,
+                backgroundcolor="white",
+                range=[-5, 5]
+            ),
+            aspectmode='cube',
+            camera=dict(
+                eye=dict(x=1.5, y=1.5, z=1.5)
+            )
+        ),
+        margin=dict(l=0, r=0, t=30, b=0),
+        height=650,
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01,
+            bgcolor="rgba(255, 255, 255, 0.9)"
+        )
+    )
 
 # ========== FUNÇÃO DE CÁLCULO ==========
-def calcular_forca_coulomb(q_teste, pos_teste, cargas_fixas):
-    """Calcula forças sobre carga de teste."""
-    forcas = []
-    forca_resultante = np.zeros(3)
+@st.cache_resource
+def _kernel_forcas():
+    """
+    Define e aquece o kernel Numba uma vez por processo.
     
-    for carga in cargas_fixas:
-        vetor_r = pos_teste - carga['pos']
-        distancia = np.linalg.norm(vetor_r)
-        
-        if distancia < 0.01:
-            distancia = 0.01
-        
-        vetor_unitario = vetor_r / distancia
-        magnitude = K_E * abs(q_teste * carga['q']) / distancia**2
-        
-        if q_teste * carga['q'] > 0:
-            vetor_forca = magnitude * vetor_unitario
-        else:
-            vetor_forca = -magnitude * vetor_unitario
+    O script é reexecutado a cada interação: um @njit ao nível do módulo
+    criaria um dispatcher novo, recarregado da cache em disco, em cada rerun.
+    
+    Returns:
+        Kernel compilado, ou None sem Numba
+    """
+    if not NUMBA_DISPONIVEL:
+        return None
+    
+    @njit(cache=True, fastmath=True)
+    def _forcas_numba(q_teste, pos_teste, pos_fixas, q_fixas, vetores_forca, magnitudes):
+        """Kernel compilado: uma só passagem pelas cargas, escreve em vetores_forca e magnitudes."""
+        for i in range(pos_fixas.shape[0]):
+            dx = pos_teste[0] - pos_fixas[i, 0]
+            dy = pos_teste[1] - pos_fixas[i, 1]
+            dz = pos_teste[2] - pos_fixas[i, 2]
+            distancia2 = max(dx*dx + dy*dy + dz*dz, 1e-4)  # distância mínima de 0.01 m
+            
+            coeficiente = K_E * q_teste * q_fixas[i] * distancia2**-1.5
+            vetores_forca[i, 0] = coeficiente * dx
+            vetores_forca[i, 1] = coeficiente * dy
+            vetores_forca[i, 2] = coeficiente * dz
+            magnitudes[i] = abs(coeficiente) * math.sqrt(distancia2)
+    
+    # Aquecer com arrays C-contíguos, o mesmo layout das chamadas reais
+    _forcas_numba(1e-6, np.zeros(3), np.ones((1, 3)), np.ones(1), np.empty((1, 3)), np.empty(1))
+    return _forcas_numba
+
+def calcular_forca_coulomb(q_teste, pos_teste, pos_fixas, q_fixas, nomes):
+    """
+    Calcula forças sobre carga de teste.
+    
+    Vetorizado sobre as N cargas fixas (arrays SoA): o sinal da força vem
+    diretamente do produto das cargas. Usa o kernel Numba quando disponível.
+    
+    Returns:
+        Tuplo (nomes, vetores (N, 3), magnitudes (N,), resultante (3,))
+    """
+    kernel = _kernel_forcas()
+    if kernel is not None:
+        vetores_forca = np.empty((len(q_fixas), 3))
+        magnitudes = np.empty(len(q_fixas))
+        kernel(q_teste, pos_teste, pos_fixas, q_fixas, vetores_forca, magnitudes)
+    else:
+        vetor_r = pos_teste[None, :] - pos_fixas  # (N, 3)
+        distancia2 = np.einsum('ij,ij->i', vetor_r, vetor_r)
+        distancia2 = np.maximum(distancia2, 1e-4)  # distância mínima de 0.01 m
         
-        forcas.append({
-            'origem': carga['nome'],
-            'vetor': vetor_forca,
-            'magnitude': magnitude
-        })
-        forca_resultante += vetor_forca
+        coeficiente = K_E * q_teste * q_fixas * distancia2**-1.5
+        vetores_forca = vetor_r * coeficiente[:, None]
+        magnitudes = np.abs(coeficiente) * np.sqrt(distancia2)
+    
+    forca_resultante = vetores_forca.sum(axis=0)
     
-    return forcas, forca_resultante
+    return nomes, vetores_forca, magnitudes, forca_resultante
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _forcas_cached(q_teste, pos_teste, cargas, nomes):
+    """
+    Versão em cache de calcular_forca_coulomb.
+    
+    As entradas são tuplos (hashable): cada carga é (q, x, y, z). Mudar só
+    a escala ou o tamanho dos marcadores não recalcula as forças.
+    
+    Returns:
+        Tuplo (nomes, vetores, magnitudes, resultante, metricas), em que
+        metricas tem 'magnitude', 'theta' e 'phi' (graus, None se a
+        direção for indefinida) e 'equilibrio'
+    """
+    cargas = np.array(cargas).reshape(-1, 4)
+    # Fatias contíguas: a mesma especialização que _kernel_forcas aqueceu
+    nomes, vetores_forca, magnitudes, forca_resultante = calcular_forca_coulomb(
+        q_teste, np.array(pos_teste), np.ascontiguousarray(cargas[:, 1:]),
+        np.ascontiguousarray(cargas[:, 0]), list(nomes)
+    )
+    
+    # Vetor de 3 componentes: escalares do math em vez de np.linalg.norm
+    fx, fy, fz = forca_resultante.tolist()
+    magnitude_resultante = math.sqrt(fx*fx + fy*fy + fz*fz)
+    theta = phi = None
+    if magnitude_resultante > 1e-10:
+        theta = math.degrees(math.atan2(fy, fx))
+        phi = math.degrees(math.atan2(fz, math.sqrt(fx*fx + fy*fy)))
+    
+    metricas = {
+        'magnitude': magnitude_resultante,
+        'theta': theta,
+        'phi': phi,
+        'equilibrio': magnitude_resultante < 1e-6
+    }
+    return nomes, vetores_forca, magnitudes, forca_resultante, metricas
+
+@st.cache_data(show_spinner=False)
+def _forcas_csv(linhas):
+    """CSV da tabela de forças, já em bytes; cada linha é um tuplo (De, Fx, Fy, Fz, |F|)."""
+    colunas = ['De', 'Fx (nN)', 'Fy (nN)', 'Fz (nN)', '|F| (nN)']
+    return pd.DataFrame(list(linhas), columns=colunas).to_csv(index=False).encode('utf-8')
 
 # ========== INICIALIZAÇÃO ==========
 # Valores padrão
@@ -95,37 +206,7 @@ if 'teste_pos' not in st.session_state:
 with st.sidebar:
     st.markdown("### ⚙️ CONFIGURAÇÃO")
     
-    # CARGA DE TESTE
-    st.markdown("#### 🎯 Carga de Teste")
-    st.markdown('<div class="test-charge-box">', unsafe_allow_html=True)
-    
-    teste_valor = st.number_input(
-        "Valor (µC)",
-        value=st.session_state.teste_valor,
-        min_value=-20.0,
-        max_value=20.0,
-        step=0.5,
-        key="input_teste_valor"
-    )
-    st.session_state.teste_valor = teste_valor
-    
-    st.markdown("**Posição:**")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        teste_x = st.slider("X", -4.0, 4.0, st.session_state.teste_pos[0], 0.1, key="slider_teste_x")
-        st.session_state.teste_pos[0] = teste_x
-    with col2:
-        teste_y = st.slider("Y", -4.0, 4.0, st.session_state.teste_pos[1], 0.1, key="slider_teste_y")
-        st.session_state.teste_pos[1] = teste_y
-    with col3:
-        teste_z = st.slider("Z", -4.0, 4.0, st.session_state.teste_pos[2], 0.1, key="slider_teste_z")
-        st.session_state.teste_pos[2] = teste_z
-    
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # CARGAS FIXAS
-    st.markdown("#### 🔧 Cargas Fixas")
-    
+    # Fora do formulário: mudar o número de cargas mostra logo as novas entradas
     num_cargas = st.number_input(
         "Número de cargas fixas:",
         min_value=1,
@@ -135,64 +216,84 @@ with st.sidebar:
         key="num_cargas"
     )
     
-    # Criar/atualizar cargas fixas
-    cargas_fixas = []
-    for i in range(num_cargas):
-        st.markdown(f'**Carga Q{i+1}**')
-        st.markdown('<div class="fixed-charge-box">', unsafe_allow_html=True)
-        
-        valor = st.number_input(
-            f"Valor (µC)",
-            value=5.0 if i == 0 else -5.0,
-            key=f"fixa_q_{i}"
-        )
+    # Valores e posições num formulário: só há rerun ao carregar em "Aplicar"
+    with st.form("config_form", border=False):
+        # CARGA DE TESTE
+        st.markdown("#### 🎯 Carga de Teste")
+        with st.container(border=True):
+            teste_valor = st.number_input(
+                "Valor (µC)",
+                value=st.session_state.teste_valor,
+                min_value=-20.0,
+                max_value=20.0,
+                step=0.5,
+                key="input_teste_valor"
+            )
+            st.session_state.teste_valor = teste_valor
+            
+            st.markdown("**Posição:**")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                teste_x = st.slider("X", -4.0, 4.0, st.session_state.teste_pos[0], 0.1, key="slider_teste_x")
+                st.session_state.teste_pos[0] = teste_x
+            with col2:
+                teste_y = st.slider("Y", -4.0, 4.0, st.session_state.teste_pos[1], 0.1, key="slider_teste_y")
+                st.session_state.teste_pos[1] = teste_y
+            with col3:
+                teste_z = st.slider("Z", -4.0, 4.0, st.session_state.teste_pos[2], 0.1, key="slider_teste_z")
+                st.session_state.teste_pos[2] = teste_z
         
-        col_x, col_y, col_z = st.columns(3)
-        with col_x:
-            x = st.slider("X", -4.0, 4.0, float(i*2 - 1), 0.1, key=f"fixa_x_{i}")
-        with col_y:
-            y = st.slider("Y", -4.0, 4.0, 0.0, 0.1, key=f"fixa_y_{i}")
-        with col_z:
-            z = st.slider("Z", -4.0, 4.0, 0.0, 0.1, key=f"fixa_z_{i}")
+        # CARGAS FIXAS
+        st.markdown("#### 🔧 Cargas Fixas")
         
-        st.markdown('</div>', unsafe_allow_html=True)
+        # Ler as cargas fixas: (valor µC, x, y, z) por carga
+        config_cargas = []
+        for i in range(num_cargas):
+            st.markdown(f'**Carga Q{i+1}**')
+            with st.container(border=True):
+                valor = st.number_input(
+                    f"Valor (µC)",
+                    value=5.0 if i == 0 else -5.0,
+                    key=f"fixa_q_{i}"
+                )
+                
+                col_x, col_y, col_z = st.columns(3)
+                with col_x:
+                    x = st.slider("X", -4.0, 4.0, float(i*2 - 1), 0.1, key=f"fixa_x_{i}")
+                with col_y:
+                    y = st.slider("Y", -4.0, 4.0, 0.0, 0.1, key=f"fixa_y_{i}")
+                with col_z:
+                    z = st.slider("Z", -4.0, 4.0, 0.0, 0.1, key=f"fixa_z_{i}")
+            
+            config_cargas.append((valor, x, y, z))
         
-        cargas_fixas.append({
-            'q': valor * 1e-6,
-            'pos': np.array([x, y, z]),
-            'valor_µC': valor,
-            'nome': f"Q{i+1}"
-        })
-    
-    st.session_state.cargas_fixas = cargas_fixas
-    
-    # OPÇÕES DE VISUALIZAÇÃO
-    st.markdown("#### ⚡ Visualização")
-    
-    mostrar_componentes = st.checkbox(
-        "Mostrar forças individuais",
-        value=st.session_state.mostrar_componentes,
-        key="check_componentes"
-    )
-    st.session_state.mostrar_componentes = mostrar_componentes
+        st.form_submit_button("✅ Aplicar", type="primary", use_container_width=True)
     
-    escala = st.slider(
-        "Escala dos vetores",
-        min_value=0.1,
-        max_value=2.0,
-        value=st.session_state.escala,
-        key="slider_escala"
-    )
-    st.session_state.escala = escala
-    
-    tamanho_marcadores = st.slider(
-        "Tamanho marcadores",
-        min_value=10,
-        max_value=40,
-        value=st.session_state.tamanho_marcadores,
-        key="slider_tamanho"
-    )
-    st.session_state.tamanho_marcadores = tamanho_marcadores
+    # Só reconstruir as cargas fixas quando a sua configuração muda
+    config_cargas = tuple(config_cargas)
+    if config_cargas != st.session_state.get('_last_cfg'):
+        # Arrays SoA preenchidos no próprio ciclo
+        pos_fixas = np.empty((num_cargas, 3))
+        q_fixas = np.empty(num_cargas)
+        cargas_fixas = []
+        for i, (valor, x, y, z) in enumerate(config_cargas):
+            pos_fixas[i] = (x, y, z)
+            q_fixas[i] = valor * 1e-6
+            
+            cargas_fixas.append({
+                'q': q_fixas[i],
+                'pos': pos_fixas[i],
+                'valor_µC': valor,
+                'nome': f"Q{i+1}"
+            })
+        
+        st.session_state.cargas_fixas = cargas_fixas
+        
+        # Mesmas cargas em formato SoA para o cálculo vetorizado
+        st.session_state.pos_fixas = pos_fixas
+        st.session_state.q_fixas = q_fixas
+        st.session_state.nomes_fixas = [carga['nome'] for carga in cargas_fixas]
+        st.session_state._last_cfg = config_cargas
     
     if st.button("🔄 Resetar Configuração", type="secondary"):
         st.session_state.clear()
@@ -204,12 +305,18 @@ st.markdown("**Ano Letivo 2025/2026 - Lei de Coulomb e Superposição Vetorial**
 
 # ========== CÁLCULOS ==========
 q_teste = st.session_state.teste_valor * 1e-6
-pos_teste = np.array(st.session_state.teste_pos)
+pos_teste = tuple(st.session_state.teste_pos)
 cargas_fixas = st.session_state.cargas_fixas
 
 # Calcular forças
-forcas_individuais, forca_resultante = calcular_forca_coulomb(q_teste, pos_teste, cargas_fixas)
-magnitude_resultante = np.linalg.norm(forca_resultante)
+cargas_tuplo = tuple(map(tuple, np.column_stack((st.session_state.q_fixas, st.session_state.pos_fixas)).tolist()))
+nomes_forcas, vetores_forca, magnitudes_forca, forca_resultante, metricas = _forcas_cached(
+    q_teste,
+    pos_teste,
+    cargas_tuplo,
+    tuple(st.session_state.nomes_fixas)
+)
+magnitude_resultante = metricas['magnitude']
 
 # ========== MÉTRICAS ==========
 st.markdown("---")
@@ -217,105 +324,129 @@ st.markdown("### 📊 ANÁLISE NUMÉRICA")
 
 col1, col2, col3 = st.columns(3)
 
-with col1:
-    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+with col1.container(border=True):
     st.metric(
         "Força Resultante",
         f"{magnitude_resultante:.2e} N",
         help="Força total sobre a carga de teste"
     )
-    st.markdown('</div>', unsafe_allow_html=True)
 
-with col2:
-    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-    if magnitude_resultante > 1e-10:
-        theta = np.degrees(np.arctan2(forca_resultante[1], forca_resultante[0]))
-        phi = np.degrees(np.arctan2(forca_resultante[2], np.sqrt(forca_resultante[0]**2 + forca_resultante[1]**2)))
-        st.metric("Direção", f"θ={theta:.0f}°, φ={phi:.0f}°")
+with col2.container(border=True):
+    if metricas['theta'] is not None:
+        st.metric("Direção", f"θ={metricas['theta']:.0f}°, φ={metricas['phi']:.0f}°")
     else:
         st.metric("Direção", "Indefinida")
-    st.markdown('</div>', unsafe_allow_html=True)
 
-with col3:
-    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-    equilibrio = magnitude_resultante < 1e-6
+with col3.container(border=True):
+    equilibrio = metricas['equilibrio']
     st.metric(
         "Equilíbrio",
         "✅ SIM" if equilibrio else "⚠️ NÃO",
         delta="Estável" if equilibrio else "Instável"
     )
-    st.markdown('</div>', unsafe_allow_html=True)
 
 # ========== VISUALIZAÇÃO 3D ==========
 st.markdown("---")
 st.markdown("### 📈 VISUALIZAÇÃO 3D")
 
-fig = go.Figure()
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _construir_figura(pos_teste, nomes, valores, pos_fixas_bytes, vetores_bytes, magnitudes_bytes, forca_resultante, magnitude_resultante,
+                      teste_valor, escala, tamanho_marcadores, mostrar_componentes):
+    """
+    Constrói a figura 3D, em cache para cada estado físico e visual.
+    
+    st.cache_resource guarda a própria figura (sem pickle nem revalidação
+    a cada acerto): é partilhada entre reruns e sessões, só de leitura.
+    
+    Args:
+        pos_teste: tuplo (x, y, z) da carga de teste
+        nomes, valores: tuplos com o nome e o valor (µC) de cada carga fixa
+        pos_fixas_bytes: posições (N, 3) das cargas fixas em bytes
+        vetores_bytes, magnitudes_bytes: forças individuais (N, 3) e (N,) em bytes
+        forca_resultante: tuplo (Fx, Fy, Fz)
+    
+    Returns:
+        go.Figure partilhada (não modificar)
+    """
+    pos_teste = np.array(pos_teste)
+    vetores_forca = np.frombuffer(vetores_bytes).reshape(-1, 3)
+    magnitudes_forca = np.frombuffer(magnitudes_bytes)
+    forca_resultante = np.array(forca_resultante)
+    
+    traces = []  # Traces em dicts simples; a figura é criada uma única vez no fim
 
-# Cores
-cor_positiva = "#EF4444"
-cor_negativa = "#3B82F6"
-cor_teste = "#F59E0B"
-cor_componente = "#6B7280"
-cor_resultante = "#DC2626"
+    # Cores
+    cor_positiva = "#EF4444"
+    cor_negativa = "#3B82F6"
+    cor_teste = "#F59E0B"
+    cor_componente = "#6B7280"
+    cor_resultante = "#DC2626"
 
-# 1. CARGAS FIXAS
-if cargas_fixas:
-    for carga in cargas_fixas:
-        cor = cor_positiva if carga['q'] > 0 else cor_negativa
+    # 1. CARGAS FIXAS (uma única trace, cor por ponto)
+    if nomes:
+        # Coordenadas em float32: metade dos dígitos no JSON enviado ao browser
+        pos_fixas = np.frombuffer(pos_fixas_bytes).reshape(-1, 3).astype(np.float32)
         
-        fig.add_trace(go.Scatter3d(
-            x=[carga['pos'][0]],
-            y=[carga['pos'][1]],
-            z=[carga['pos'][2]],
+        traces.append(dict(
+            type='scatter3d',
+            x=pos_fixas[:, 0],
+            y=pos_fixas[:, 1],
+            z=pos_fixas[:, 2],
             mode='markers+text',
             marker=dict(
-                size=st.session_state.tamanho_marcadores,
-                color=cor,
+                size=tamanho_marcadores,
+                color=[cor_positiva if valor > 0 else cor_negativa for valor in valores],
                 symbol='circle',
                 line=dict(color='white', width=2),
                 opacity=0.9
             ),
-            text=[f"Fixa {carga['nome']}"],
+            text=[f"Fixa {nome}" for nome in nomes],
+            hovertext=[f"{nome} ({valor} µC)" for nome, valor in zip(nomes, valores)],
             textposition="top center",
-            name=f"{carga['nome']} ({carga['valor_µC']} µC)",
+            name="Cargas fixas",
             legendgroup="fixas",
             showlegend=True
         ))
 
-# 2. CARGA DE TESTE
-fig.add_trace(go.Scatter3d(
-    x=[pos_teste[0]],
-    y=[pos_teste[1]],
-    z=[pos_teste[2]],
-    mode='markers+text',
-    marker=dict(
-        size=st.session_state.tamanho_marcadores + 10,
-        color=cor_teste,
-        symbol='diamond',
-        line=dict(color='black', width=3),
-        opacity=1.0
-    ),
-    text=["TESTE"],
-    textposition="bottom center",
-    name=f"🎯 Teste ({st.session_state.teste_valor} µC)",
-    legendgroup="teste",
-    showlegend=True
-))
-
-# 3. FORÇAS COMPONENTES
-if st.session_state.mostrar_componentes and forcas_individuais:
-    for forca in forcas_individuais:
-        if forca['magnitude'] > 1e-12:
-            escala_visual = st.session_state.escala * 1e9
-            vetor_visual = forca['vetor'] * escala_visual
-            ponto_final = pos_teste + vetor_visual
+    # 2. CARGA DE TESTE
+    traces.append(dict(
+        type='scatter3d',
+        x=[pos_teste[0]],
+        y=[pos_teste[1]],
+        z=[pos_teste[2]],
+        mode='markers+text',
+        marker=dict(
+            size=tamanho_marcadores + 10,
+            color=cor_teste,
+            symbol='diamond',
+            line=dict(color='black', width=3),
+            opacity=1.0
+        ),
+        text=["TESTE"],
+        textposition="bottom center",
+        name=f"🎯 Teste ({teste_valor} µC)",
+        legendgroup="teste",
+        showlegend=True
+    ))
+
+    # 3. FORÇAS COMPONENTES (todas as linhas numa trace, todas as cabeças num Cone)
+    if mostrar_componentes and len(vetores_forca):
+        vetores_visuais = (vetores_forca[magnitudes_forca > 1e-12] * (escala * 1e9)).astype(np.float32)
+        pontos_finais = (pos_teste + vetores_visuais).astype(np.float32)
+        
+        if len(pontos_finais):
+            # Linhas: segmentos teste -> ponto final, separados por NaN
+            segmentos = np.empty((len(pontos_finais), 3, 3), dtype=np.float32)
+            segmentos[:, 0] = pos_teste
+            segmentos[:, 1] = pontos_finais
+            segmentos[:, 2] = np.nan
+            segmentos = segmentos.reshape(-1, 3)
             
-            # Linha
-            fig.add_trace(go.Scatter3d(
-                x=[pos_teste[0], ponto_final[0]],
-                y=[pos_teste[1], ponto_final[1]],
-                z=[pos_teste[2], ponto_final[2]],
+            traces.append(dict(
+                type='scatter3d',
+                x=segmentos[:, 0],
+                y=segmentos[:, 1],
+                z=segmentos[:, 2],
                 mode='lines',
                 line=dict(
                     color=cor_componente,
@@ -326,144 +457,158 @@ if st.session_state.mostrar_componentes and forcas_individuais:
                 hoverinfo='skip'
             ))
             
-            # Cabeça
-            fig.add_trace(go.Cone(
-                x=[ponto_final[0]],
-                y=[ponto_final[1]],
-                z=[ponto_final[2]],
-                u=[vetor_visual[0]],
-                v=[vetor_visual[1]],
-                w=[vetor_visual[2]],
+            # Cabeças
+            traces.append(dict(
+                type='cone',
+                x=pontos_finais[:, 0],
+                y=pontos_finais[:, 1],
+                z=pontos_finais[:, 2],
+                u=vetores_visuais[:, 0],
+                v=vetores_visuais[:, 1],
+                w=vetores_visuais[:, 2],
                 sizemode='absolute',
                 sizeref=0.3,
                 colorscale=[[0, cor_componente], [1, cor_componente]],
+                cmin=0,
+                cmax=1,  # Escala fixa: sem auto-range em cada render
                 showscale=False,
+                lighting=dict(ambient=0.8, diffuse=0.2),
                 hoverinfo='skip'
             ))
 
-# 4. FORÇA RESULTANTE
-if magnitude_resultante > 1e-12:
-    escala_resultante = st.session_state.escala * 1e9
-    vetor_resultante_visual = forca_resultante * escala_resultante
-    ponto_final_resultante = pos_teste + vetor_resultante_visual
-    
-    # Linha
-    fig.add_trace(go.Scatter3d(
-        x=[pos_teste[0], ponto_final_resultante[0]],
-        y=[pos_teste[1], ponto_final_resultante[1]],
-        z=[pos_teste[2], ponto_final_resultante[2]],
-        mode='lines',
-        line=dict(
-            color=cor_resultante,
-            width=6
-        ),
-        name=f"🔴 Resultante: {magnitude_resultante:.2e} N",
-        legendgroup="resultante",
-        showlegend=True
-    ))
-    
-    # Cabeça
-    fig.add_trace(go.Cone(
-        x=[ponto_final_resultante[0]],
-        y=[ponto_final_resultante[1]],
-        z=[ponto_final_resultante[2]],
-        u=[vetor_resultante_visual[0]],
-        v=[vetor_resultante_visual[1]],
-        w=[vetor_resultante_visual[2]],
-        sizemode='absolute',
-        sizeref=0.5,
-        colorscale=[[0, cor_resultante], [1, cor_resultante]],
-        showscale=False,
-        hoverinfo='skip'
-    ))
+    # 4. FORÇA RESULTANTE
+    if magnitude_resultante > 1e-12:
+        escala_resultante = escala * 1e9
+        vetor_resultante_visual = forca_resultante * escala_resultante
+        ponto_final_resultante = pos_teste + vetor_resultante_visual
+        
+        # Linha
+        traces.append(dict(
+            type='scatter3d',
+            x=[pos_teste[0], ponto_final_resultante[0]],
+            y=[pos_teste[1], ponto_final_resultante[1]],
+            z=[pos_teste[2], ponto_final_resultante[2]],
+            mode='lines',
+            line=dict(
+                color=cor_resultante,
+                width=6
+            ),
+            name=f"🔴 Resultante: {magnitude_resultante:.2e} N",
+            legendgroup="resultante",
+            showlegend=True
+        ))
+        
+        # Cabeça
+        traces.append(dict(
+            type='cone',
+            x=[ponto_final_resultante[0]],
+            y=[ponto_final_resultante[1]],
+            z=[ponto_final_resultante[2]],
+            u=[vetor_resultante_visual[0]],
+            v=[vetor_resultante_visual[1]],
+            w=[vetor_resultante_visual[2]],
+            sizemode='absolute',
+            sizeref=0.5,
+            colorscale=[[0, cor_resultante], [1, cor_resultante]],
+            cmin=0,
+            cmax=1,  # Escala fixa: sem auto-range em cada render
+            showscale=False,
+            lighting=dict(ambient=0.8, diffuse=0.2),
+            hoverinfo='skip'
+        ))
 
-# Layout do gráfico
-fig.update_layout(
-    scene=dict(
-        xaxis=dict(
-            title="Eixo X (m)",
-            gridcolor="lightgray",
-            showbackground=True,
-            backgroundcolor="white",
-            range=[-5, 5]
-        ),
-        yaxis=dict(
-            title="Eixo Y (m)",
-            gridcolor="lightgray",
-            showbackground=True,
-            backgroundcolor="white",
-            range=[-5, 5]
-        ),
-        zaxis=dict(
-            title="Eixo Z (m)",
-            gridcolor="lightgray",
-            showbackground=True,
-            backgroundcolor="white",
-            range=[-5, 5]
-        ),
-        aspectmode='cube',
-        camera=dict(
-            eye=dict(x=1.5, y=1.5, z=1.5)
+    # Figura construída de uma só vez, com o layout fixo (em cache)
+    fig = go.Figure({'data': traces, 'layout': _layout_base()})
+    return fig
+
+@st.fragment
+def mostrar_visualizacao(pos_teste, cargas_fixas, vetores_forca, magnitudes_forca, forca_resultante, magnitude_resultante):
+    """Controlos visuais e gráfico 3D; as forças e a figura vêm da cache."""
+    # Opções só visuais: mudá-las reexecuta apenas este fragmento
+    col_v1, col_v2, col_v3 = st.columns(3)
+    with col_v1:
+        mostrar_componentes = st.checkbox(
+            "Mostrar forças individuais",
+            value=st.session_state.mostrar_componentes,
+            key="check_componentes"
         )
-    ),
-    margin=dict(l=0, r=0, t=30, b=0),
-    height=650,
-    showlegend=True,
-    legend=dict(
-        yanchor="top",
-        y=0.99,
-        xanchor="left",
-        x=0.01,
-        bgcolor="rgba(255, 255, 255, 0.9)"
+        st.session_state.mostrar_componentes = mostrar_componentes
+    with col_v2:
+        escala = st.slider(
+            "Escala dos vetores",
+            min_value=0.1,
+            max_value=2.0,
+            value=st.session_state.escala,
+            key="slider_escala"
+        )
+        st.session_state.escala = escala
+    with col_v3:
+        tamanho_marcadores = st.slider(
+            "Tamanho marcadores",
+            min_value=10,
+            max_value=40,
+            value=st.session_state.tamanho_marcadores,
+            key="slider_tamanho"
+        )
+        st.session_state.tamanho_marcadores = tamanho_marcadores
+
+    fig = _construir_figura(
+        pos_teste,
+        tuple(st.session_state.nomes_fixas),
+        tuple(carga['valor_µC'] for carga in cargas_fixas),
+        st.session_state.pos_fixas.tobytes(),  # Array contíguo, já construído na barra lateral
+        vetores_forca.tobytes(),
+        magnitudes_forca.tobytes(),
+        tuple(forca_resultante),
+        magnitude_resultante,
+        st.session_state.teste_valor,
+        escala,
+        tamanho_marcadores,
+        mostrar_componentes
     )
-)
 
-st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True)
+
+mostrar_visualizacao(pos_teste, cargas_fixas, vetores_forca, magnitudes_forca, forca_resultante, magnitude_resultante)
 
 # ========== TABELA ==========
 st.markdown("---")
 st.markdown("### 📋 TABELA DE FORÇAS")
 
-if forcas_individuais:
-    dados = []
-    for forca in forcas_individuais:
-        dados.append({
-            'De': forca['origem'],
-            'Fx (nN)': forca['vetor'][0] * 1e9,
-            'Fy (nN)': forca['vetor'][1] * 1e9,
-            'Fz (nN)': forca['vetor'][2] * 1e9,
-            '|F| (nN)': forca['magnitude'] * 1e9
-        })
-    
-    dados.append({
-        'De': '🔴 RESULTANTE',
-        'Fx (nN)': forca_resultante[0] * 1e9,
-        'Fy (nN)': forca_resultante[1] * 1e9,
-        'Fz (nN)': forca_resultante[2] * 1e9,
-        '|F| (nN)': magnitude_resultante * 1e9
-    })
-    
-    df = pd.DataFrame(dados)
-    
-    def highlight_row(row):
-        if row['De'] == '🔴 RESULTANTE':
-            return ['background-color: #FEE2E2; font-weight: bold;'] * len(row)
-        return [''] * len(row)
-    
-    st.dataframe(
-        df.style.format("{:.2f}").apply(highlight_row, axis=1),
-        use_container_width=True,
-        height=300
-    )
-    
-    # Exportar
-    csv = df.to_csv(index=False)
-    st.download_button(
-        "📥 Exportar CSV",
-        csv,
-        "forcas_eletrostaticas.csv",
-        "text/csv"
-    )
+@st.fragment
+def mostrar_tabela(nomes_forcas, vetores_forca, magnitudes_forca, forca_resultante, magnitude_resultante):
+    """Tabela de forças e exportação CSV; o download só reexecuta este fragmento."""
+    if len(nomes_forcas):
+        # Uma linha por carga fixa e a resultante no fim, tudo em nN
+        colunas_nN = ['Fx (nN)', 'Fy (nN)', 'Fz (nN)', '|F| (nN)']
+        valores = np.vstack((
+            np.column_stack((vetores_forca, magnitudes_forca)),
+            np.append(forca_resultante, magnitude_resultante)
+        )) * 1e9
+        
+        df = pd.DataFrame(valores, columns=colunas_nN)
+        df.insert(0, 'De', list(nomes_forcas) + ['🔴 RESULTANTE'])
+        
+        # Formatação no frontend; a linha da resultante já vem marcada com 🔴
+        formato_nN = st.column_config.NumberColumn(format="%.2f")
+        st.dataframe(
+            df,
+            column_config={coluna: formato_nN for coluna in colunas_nN},
+            use_container_width=True,
+            hide_index=True,
+            height=300
+        )
+        
+        # Exportar
+        csv = _forcas_csv(tuple(df.itertuples(index=False, name=None)))
+        st.download_button(
+            "📥 Exportar CSV",
+            csv,
+            "forcas_eletrostaticas.csv",
+            "text/csv"
+        )
+
+mostrar_tabela(nomes_forcas, vetores_forca, magnitudes_forca, forca_resultante, magnitude_resultante)
 
 # ========== LEGENDA ==========
 with st.expander("📖 LEGENDA", expanded=True):